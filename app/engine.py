@@ -1,9 +1,17 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Callable, Dict, Optional, List
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass, field, replace
+from functools import partial
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, List, Tuple
 from uuid import uuid4
+import asyncio
 import copy
+import operator
+import sys
+import threading
 
 from .models import EdgeConfig, NodeConfig, StepLog
 
@@ -13,6 +21,11 @@ class Node:
     id: str
     tool: str
     config: Dict[str, Any]
+    # Resolved once in create_graph so the run loop skips the registry lookup
+    tool_fn: Optional[Callable[[Dict[str, Any], Any], Dict[str, Any]]] = None
+    # What the tool is actually called with: a namedtuple with defaults
+    # filled in if the tool declares CONFIG_SCHEMA, otherwise `config`
+    resolved_config: Any = None
 
 
 @dataclass
@@ -25,6 +38,76 @@ class Edge:
     condition_value: Any = None
     true_target: Optional[str] = None
     false_target: Optional[str] = None
+    # Resolved in create_graph: operator function for condition_op, and a
+    # state -> state.get(condition_key) reader
+    compare_fn: Optional[Callable[[Any, Any], bool]] = None
+    value_fn: Optional[Callable[[Dict[str, Any]], Any]] = None
+
+
+# One flattened node of a compiled graph. Targets are indices into
+# Graph.compiled, with _END meaning "terminate".
+CompiledStep = namedtuple(
+    "CompiledStep",
+    "node_id tool tool_fn config next_idx "
+    "value_fn compare_fn cond_value true_idx false_idx",
+)
+
+_END = -1
+
+_CMP: Dict[str, Callable[[Any, Any], bool]] = {
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "lt": operator.lt,
+    "le": operator.le,
+    "eq": operator.eq,
+    "ne": operator.ne,
+}
+
+_IMMUTABLE_TYPES = frozenset({str, int, float, bool, type(None), bytes})
+
+# Sentinel for "no value" (absent journal keys, rejected config values)
+_MISSING = object()
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return None if value is None else sys.intern(value)
+
+
+def _convert_config_value(value: Any, field_type: type) -> Any:
+    """
+    Return value as field_type, or _MISSING if that would lose information.
+
+    Only lossless conversions are made: int -> float, and integral
+    float -> int. bool is not accepted as a number, and strings are never
+    parsed.
+    """
+    if isinstance(value, bool) and field_type is not bool:
+        return _MISSING
+    if isinstance(value, field_type):
+        return value
+    if field_type is float and isinstance(value, int):
+        return float(value)
+    if field_type is int and isinstance(value, float) and value.is_integer():
+        return int(value)
+    return _MISSING
+
+
+def _fast_snapshot(obj: Any) -> Any:
+    """
+    Deep-copy JSON-shaped state (dicts/lists of scalars) without the
+    memo table and copy-protocol dispatch of copy.deepcopy. Anything
+    else falls back to copy.deepcopy.
+    """
+    t = type(obj)
+    if t in _IMMUTABLE_TYPES:
+        return obj
+    if t is dict:
+        return {k: _fast_snapshot(v) for k, v in obj.items()}
+    if t is list:
+        return [_fast_snapshot(v) for v in obj]
+    if t is tuple:
+        return tuple(_fast_snapshot(v) for v in obj)
+    return copy.deepcopy(obj)
 
 
 @dataclass
@@ -34,6 +117,45 @@ class Graph:
     start_node: str
     nodes: Dict[str, Node]
     edges: Dict[str, Edge]  # keyed by from_node
+    # Built by create_graph; this is what run_graph actually executes
+    compiled: List[CompiledStep] = field(default_factory=list)
+    start_index: int = _END
+
+
+class DeltaState:
+    """
+    Run state as a live dict plus an append-only undo journal.
+
+    `view` is the current state (what tools read). Every update appends
+    one (step, key, previous value) entry to the journal, so a snapshot
+    is just the journal length and any earlier state can be rebuilt by
+    undoing entries, without ever copying the whole state per step.
+    """
+
+    def __init__(self, initial: Dict[str, Any]) -> None:
+        self.view: Dict[str, Any] = dict(initial)
+        self._journal: List[Tuple[int, str, Any]] = []
+
+    @property
+    def snapshot_id(self) -> int:
+        return len(self._journal)
+
+    def update(self, step: int, updates: Dict[str, Any]) -> None:
+        view = self.view
+        journal = self._journal
+        for key, value in updates.items():
+            journal.append((step, key, view.get(key, _MISSING)))
+            view[key] = value
+
+    def state_at(self, snapshot_id: int) -> Dict[str, Any]:
+        """Materialize the state as of `snapshot_id` (view is untouched)."""
+        state = dict(self.view)
+        for _, key, old in reversed(self._journal[snapshot_id:]):
+            if old is _MISSING:
+                state.pop(key, None)
+            else:
+                state[key] = old
+        return state
 
 
 @dataclass
@@ -42,8 +164,10 @@ class Run:
     graph_id: str
     status: str
     current_node: Optional[str]
-    state: Dict[str, Any]
+    state: Dict[str, Any]  # the live view of `journal`
     log: List[StepLog]
+    journal: DeltaState
+    error: Optional[str] = None
 
 
 class ToolRegistry:
@@ -52,19 +176,64 @@ class ToolRegistry:
 
     Tool signature:
         def tool(state: dict, config: dict) -> dict:
-            # read/modify state and return updates
+            # read state and return updates
+
+    Tools must not modify `state` or the values in it: every change has to
+    be returned in the updates dict. The engine records only those updates
+    (see DeltaState / reconstruct_state), so a direct write would be
+    missing from the run history.
+
+    A tool may declare `tool.CONFIG_SCHEMA = {"field": (type, default), ...}`.
+    Its node config is then resolved once at graph creation into a
+    namedtuple with defaults filled in, and the tool reads `config.field`
+    instead of probing a dict on every call.
     """
 
     def __init__(self) -> None:
-        self._tools: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]] = {}
+        self._tools: Dict[str, Callable[[Dict[str, Any], Any], Dict[str, Any]]] = {}
+        # Read-only live view, safe to hand out without copying
+        self._tools_view = MappingProxyType(self._tools)
+        # name -> (namedtuple type, schema) for tools with CONFIG_SCHEMA
+        self._config_types: Dict[str, Tuple[type, Dict[str, Tuple[type, Any]]]] = {}
 
-    def register(self, name: str, func: Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]) -> None:
+    def register(self, name: str, func: Callable[[Dict[str, Any], Any], Dict[str, Any]]) -> None:
         self._tools[name] = func
+        schema = getattr(func, "CONFIG_SCHEMA", None)
+        if schema is None:
+            self._config_types.pop(name, None)
+        else:
+            self._config_types[name] = (namedtuple("ToolConfig", list(schema)), schema)
+
+    def resolve_config(self, name: str, config: Dict[str, Any]) -> Any:
+        """
+        Turn a node's raw config dict into what the tool expects.
+
+        Raises ValueError if a value doesn't match its schema type.
+        """
+        if name not in self._config_types:
+            return config
+        config_type, schema = self._config_types[name]
+        values = []
+        for field_name, (field_type, default) in schema.items():
+            raw = config.get(field_name, default)
+            value = _convert_config_value(raw, field_type)
+            if value is _MISSING:
+                raise ValueError(
+                    f"Tool '{name}': config '{field_name}' must be "
+                    f"{field_type.__name__}, got {raw!r}."
+                )
+            values.append(value)
+        return config_type(*values)
 
-    def get(self, name: str) -> Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]:
-        if name not in self._tools:
-            raise KeyError(f"Tool '{name}' is not registered.")
-        return self._tools[name]
+    def get(self, name: str) -> Callable[[Dict[str, Any], Any], Dict[str, Any]]:
+        try:
+            return self._tools[name]
+        except KeyError:
+            raise KeyError(f"Tool '{name}' is not registered.") from None
+
+    @property
+    def tools(self) -> Mapping[str, Callable[[Dict[str, Any], Any], Dict[str, Any]]]:
+        return self._tools_view
 
     def list_tools(self) -> List[str]:
         return list(self._tools.keys())
@@ -76,15 +245,31 @@ class GraphEngine:
 
     Responsibilities:
       - Store graphs
-      - Store runs
+      - Store runs (bounded, least recently used evicted first)
       - Execute a graph step-by-step with shared state
       - Support simple branching and loops
+
+    max_runs / max_graphs cap how many runs / graphs are kept in memory
+    (None = unbounded). Runs still "running" are never evicted, so the
+    run count can exceed max_runs while they are in flight. on_evict_run,
+    if given, is called with each finished run as it is evicted, e.g. to
+    persist it to disk.
     """
 
-    def __init__(self, tool_registry: ToolRegistry) -> None:
+    def __init__(self, tool_registry: ToolRegistry,
+                 max_runs: Optional[int] = 1000,
+                 max_graphs: Optional[int] = None,
+                 on_evict_run: Optional[Callable[[Run], None]] = None) -> None:
         self.tool_registry = tool_registry
-        self.graphs: Dict[str, Graph] = {}
-        self.runs: Dict[str, Run] = {}
+        self.max_runs = max_runs
+        self.max_graphs = max_graphs
+        self.on_evict_run = on_evict_run
+        self.graphs: OrderedDict[str, Graph] = OrderedDict()
+        self.runs: OrderedDict[str, Run] = OrderedDict()
+        # Both maps are read and reordered from worker threads
+        # (asyncio.to_thread, FastAPI's threadpool, background runs)
+        self._graphs_lock = threading.Lock()
+        self._runs_lock = threading.Lock()
 
     # ---------- Graph management ----------
 
@@ -94,20 +279,52 @@ class GraphEngine:
         nodes: Dict[str, Node] = {}
         edges: Dict[str, Edge] = {}
 
+        # Ids, tool names and state keys are interned so repeated dict
+        # lookups on them (here and across graphs) hit the identity fast path.
+        start_node = sys.intern(start_node)
+
         for nc in nodes_cfg:
-            nodes[nc.id] = Node(id=nc.id, tool=nc.tool, config=nc.config)
+            node_id = sys.intern(nc.id)
+            tool = sys.intern(nc.tool)
+            # Raises KeyError for unknown tools: fail at creation, not mid-run
+            tool_fn = self.tool_registry.get(tool)
+            nodes[node_id] = Node(
+                id=node_id,
+                tool=tool,
+                config=nc.config,
+                tool_fn=tool_fn,
+                resolved_config=self.tool_registry.resolve_config(tool, nc.config),
+            )
 
         for ec in edges_cfg:
-            edges[ec.from_node] = Edge(
-                from_node=ec.from_node,
-                to_node=ec.to_node,
-                condition_key=ec.condition_key,
+            compare_fn = None
+            if ec.condition_op is not None:
+                if ec.condition_op not in _CMP:
+                    raise KeyError(f"Unsupported operator '{ec.condition_op}'.")
+                compare_fn = _CMP[ec.condition_op]
+
+            condition_key = _intern(ec.condition_key)
+            value_fn = None
+            if condition_key is not None:
+                # methodcaller keeps dict.get semantics (None on a missing
+                # key) without a Python-level lambda frame per call
+                value_fn = operator.methodcaller("get", condition_key)
+
+            from_node = sys.intern(ec.from_node)
+            edges[from_node] = Edge(
+                from_node=from_node,
+                to_node=_intern(ec.to_node),
+                condition_key=condition_key,
                 condition_op=ec.condition_op,
                 condition_value=ec.condition_value,
-                true_target=ec.true_target,
-                false_target=ec.false_target,
+                true_target=_intern(ec.true_target),
+                false_target=_intern(ec.false_target),
+                compare_fn=compare_fn,
+                value_fn=value_fn,
             )
 
+        start_index, compiled = self._compile(start_node, nodes, edges)
+
         graph_id = str(uuid4())
         graph = Graph(
             id=graph_id,
@@ -115,102 +332,249 @@ class GraphEngine:
             start_node=start_node,
             nodes=nodes,
             edges=edges,
+            compiled=compiled,
+            start_index=start_index,
         )
-        self.graphs[graph_id] = graph
+        with self._graphs_lock:
+            self.graphs[graph_id] = graph
+            if self.max_graphs is not None:
+                while len(self.graphs) > self.max_graphs:
+                    self.graphs.popitem(last=False)
         return graph_id
 
+    @staticmethod
+    def _compile(start_node: str, nodes: Dict[str, Node],
+                 edges: Dict[str, Edge]) -> Tuple[int, List[CompiledStep]]:
+        """
+        Flatten nodes + edges into a list of CompiledStep indexed by int,
+        so the run loop does no per-step dict lookups or None checks.
+
+        Raises KeyError if the start node or an edge target is unknown.
+        """
+        index = {node_id: i for i, node_id in enumerate(nodes)}
+
+        def resolve(node_id: Optional[str]) -> int:
+            if node_id is None:
+                return _END
+            if node_id not in index:
+                raise KeyError(f"Node '{node_id}' not found.")
+            return index[node_id]
+
+        compiled: List[CompiledStep] = []
+        for node in nodes.values():
+            edge = edges.get(node.id)
+            next_idx = _END
+            value_fn = compare_fn = cond_value = None
+            true_idx = false_idx = _END
+
+            if edge is None:
+                # No outgoing edge → terminal node
+                pass
+            elif edge.condition_key is None or edge.condition_op is None:
+                # No condition → simple linear edge
+                next_idx = resolve(edge.to_node)
+            else:
+                value_fn = edge.value_fn
+                compare_fn = edge.compare_fn
+                cond_value = edge.condition_value
+                true_idx = resolve(edge.true_target)
+                false_idx = resolve(edge.false_target)
+
+            compiled.append(CompiledStep(
+                node_id=node.id,
+                tool=node.tool,
+                tool_fn=node.tool_fn,
+                config=node.resolved_config,
+                next_idx=next_idx,
+                value_fn=value_fn,
+                compare_fn=compare_fn,
+                cond_value=cond_value,
+                true_idx=true_idx,
+                false_idx=false_idx,
+            ))
+
+        return resolve(start_node), compiled
+
     def get_graph(self, graph_id: str) -> Graph:
-        if graph_id not in self.graphs:
-            raise KeyError(f"Graph '{graph_id}' not found.")
-        return self.graphs[graph_id]
+        with self._graphs_lock:
+            if graph_id not in self.graphs:
+                raise KeyError(f"Graph '{graph_id}' not found.")
+            self.graphs.move_to_end(graph_id)
+            return self.graphs[graph_id]
 
     # ---------- Run / Execution ----------
 
-    @staticmethod
-    def _compare(lhs: Any, op: str, rhs: Any) -> bool:
-        if op == "gt":
-            return lhs > rhs
-        if op == "ge":
-            return lhs >= rhs
-        if op == "lt":
-            return lhs < rhs
-        if op == "le":
-            return lhs <= rhs
-        if op == "eq":
-            return lhs == rhs
-        if op == "ne":
-            return lhs != rhs
-        raise ValueError(f"Unsupported operator '{op}'.")
-
-    def _next_node_id(self, graph: Graph, current_node_id: str, state: Dict[str, Any]) -> Optional[str]:
-        edge = graph.edges.get(current_node_id)
-        if edge is None:
-            # No outgoing edge → terminal node
-            return None
-
-        # No condition → simple linear edge
-        if edge.condition_key is None or edge.condition_op is None:
-            return edge.to_node
-
-        # Conditional edge
-        value = state.get(edge.condition_key)
-        result = self._compare(value, edge.condition_op, edge.condition_value)
-        return edge.true_target if result else edge.false_target
-
     def run_graph(self, graph_id: str, initial_state: Dict[str, Any],
-                  max_steps: int = 100) -> Run:
+                  max_steps: int = 100, snapshot_full: bool = False) -> Run:
+        """
+        Execute a graph from its start node until it terminates or
+        max_steps is reached.
+
+        Each StepLog records only the updates its tool returned. Pass
+        snapshot_full=True to also keep a full copy of the state after
+        every step (useful for debugging, but O(state size) per step).
+        """
         graph = self.get_graph(graph_id)
+        run = self._start_run(graph, initial_state)
+        self._execute(run, graph, max_steps, snapshot_full)
+        return run
+
+    def submit_run(self, executor: Executor, graph_id: str,
+                   initial_state: Dict[str, Any], max_steps: int = 100,
+                   snapshot_full: bool = False) -> Run:
+        """
+        Register a run and execute it on `executor`, returning immediately.
+
+        The returned Run has status "running"; its state, log and
+        current_node are updated in place after every step, so it can be
+        polled with get_run() until the status changes.
+        """
+        graph = self.get_graph(graph_id)
+        run = self._start_run(graph, initial_state)
+        try:
+            future = executor.submit(self._execute, run, graph, max_steps, snapshot_full)
+            future.add_done_callback(partial(self._mark_cancelled, run))
+        except Exception as e:
+            # Never started: don't leave it looking like it's in progress
+            run.error = str(e)
+            run.status = "failed"  # last, so readers see the error with it
+            raise
+        return run
 
-        run_id = str(uuid4())
-        state: Dict[str, Any] = dict(initial_state)  # shallow copy
-        logs: List[StepLog] = []
+    @staticmethod
+    def _mark_cancelled(run: Run, future: Future) -> None:
+        # e.g. executor shut down with cancel_futures before the run started
+        if future.cancelled():
+            run.error = "Run was cancelled before it started."
+            run.status = "failed"
+
+    def _start_run(self, graph: Graph, initial_state: Dict[str, Any]) -> Run:
+        journal = DeltaState(initial_state)
+        run = Run(
+            id=str(uuid4()),
+            graph_id=graph.id,
+            status="running",
+            current_node=graph.start_node,
+            state=journal.view,
+            log=[],
+            journal=journal,
+        )
+        self._store_run(run)
+        return run
 
-        current_node_id: Optional[str] = graph.start_node
+    def _execute(self, run: Run, graph: Graph, max_steps: int,
+                 snapshot_full: bool) -> None:
+        try:
+            self._execute_steps(run, graph, max_steps, snapshot_full)
+        except Exception as e:
+            run.error = str(e)
+            run.status = "failed"  # last, so readers see the error with it
+            raise
+
+    @staticmethod
+    def _execute_steps(run: Run, graph: Graph, max_steps: int,
+                       snapshot_full: bool) -> None:
+        journal = run.journal
+        state = journal.view
+        logs = run.log
+
+        compiled = graph.compiled
+        idx = graph.start_index
         status = "running"
 
         for step_index in range(max_steps):
-            if current_node_id is None:
+            if idx == _END:
                 status = "completed"
                 break
 
-            node = graph.nodes.get(current_node_id)
-            if node is None:
-                status = "failed"
-                break
+            cs = compiled[idx]
+            run.current_node = cs.node_id
 
-            tool = self.tool_registry.get(node.tool)
-            # Call tool, merge returned updates into state
-            updates = tool(state, node.config) or {}
-            state.update(updates)
+            # Call tool, merge returned updates into state.
+            # Only the delta is logged; the journal remembers overwritten
+            # values, so past states can be rebuilt with reconstruct_state()
+            # instead of copying the whole state on every step.
+            updates = cs.tool_fn(state, cs.config) or {}
+            journal.update(step_index, updates)
 
             logs.append(
                 StepLog(
                     step_index=step_index,
-                    node_id=node.id,
-                    tool=node.tool,
-                    state_snapshot=copy.deepcopy(state),
+                    node_id=cs.node_id,
+                    tool=cs.tool,
+                    updates=dict(updates),
+                    snapshot_id=journal.snapshot_id,
+                    state_snapshot=_fast_snapshot(state) if snapshot_full else None,
                 )
             )
 
-            next_node_id = self._next_node_id(graph, current_node_id, state)
-            current_node_id = next_node_id
+            if cs.value_fn is None:
+                idx = cs.next_idx
+            elif cs.compare_fn(cs.value_fn(state), cs.cond_value):
+                idx = cs.true_idx
+            else:
+                idx = cs.false_idx
 
         else:
             # If we exit by hitting max_steps
             status = "failed"
 
-        run = Run(
-            id=run_id,
-            graph_id=graph_id,
-            status=status,
-            current_node=current_node_id,
-            state=state,
-            log=logs,
+        run.current_node = None if idx == _END else compiled[idx].node_id
+        run.status = status
+
+    async def run_graph_async(self, graph_id: str, initial_state: Dict[str, Any],
+                              max_steps: int = 100, snapshot_full: bool = False) -> Run:
+        """
+        Same as run_graph, but executes in a worker thread so async callers
+        (e.g. FastAPI endpoints) don't block the event loop on long runs.
+        """
+        return await asyncio.to_thread(
+            self.run_graph, graph_id, initial_state, max_steps, snapshot_full
         )
-        self.runs[run_id] = run
+
+    def _store_run(self, run: Run) -> None:
+        evicted: List[Run] = []
+        with self._runs_lock:
+            self.runs[run.id] = run
+            if self.max_runs is not None and len(self.runs) > self.max_runs:
+                # Oldest first, skipping runs that are queued or executing
+                for run_id, stored in list(self.runs.items()):
+                    if len(self.runs) <= self.max_runs:
+                        break
+                    if stored.status != "running":
+                        evicted.append(self.runs.pop(run_id))
+
+        if self.on_evict_run is not None:
+            for stored in evicted:
+                self.on_evict_run(stored)
+
+    def get_run(self, run_id: str, include_log: bool = True) -> Run:
+        """
+        Fetch a run. With include_log=False the returned Run has an empty
+        log, so lightweight status polls don't carry the step history.
+        """
+        with self._runs_lock:
+            if run_id not in self.runs:
+                raise KeyError(f"Run '{run_id}' not found.")
+            self.runs.move_to_end(run_id)
+            run = self.runs[run_id]
+        if not include_log:
+            return replace(run, log=[])
         return run
 
-    def get_run(self, run_id: str) -> Run:
-        if run_id not in self.runs:
-            raise KeyError(f"Run '{run_id}' not found.")
-        return self.runs[run_id]
+
+def reconstruct_state(run: Run, up_to_step: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Rebuild the state as it was after `up_to_step` by undoing the run's
+    journal back to that step's snapshot.
+
+    If `up_to_step` is None, the current state is returned (as a copy).
+    """
+    snapshot_id = run.journal.snapshot_id
+    if up_to_step is not None:
+        snapshot_id = 0
+        for entry in run.log:
+            if entry.step_index > up_to_step:
+                break
+            snapshot_id = entry.snapshot_id
+    return run.journal.state_at(snapshot_id)
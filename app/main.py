@@ -1,5 +1,9 @@
-from fastapi import FastAPI, HTTPException
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Response
+from pydantic import BaseModel
+from typing import AsyncIterator, Dict, Any, Optional
 
 from .engine import GraphEngine, ToolRegistry
 from .models import (
@@ -13,14 +17,32 @@ from .tools import register_default_tools
 from .workflows import create_summarization_workflow
 
 
-app = FastAPI(title="Minimal Agent Workflow Engine")
-
 # Global engine + registry
 tool_registry = ToolRegistry()
 register_default_tools(tool_registry)
 
 engine = GraphEngine(tool_registry=tool_registry)
 
+# Worker pool for runs submitted with "background": true.
+# Owned by the app lifespan, so each startup gets a fresh pool.
+run_executor: Optional[ThreadPoolExecutor] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    global run_executor
+    run_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="graph-run")
+    try:
+        yield
+    finally:
+        executor, run_executor = run_executor, None
+        # Stop accepting background runs; queued ones are cancelled and
+        # marked failed by the engine
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(title="Minimal Agent Workflow Engine", lifespan=lifespan)
+
 # Create example workflow on startup
 EXAMPLE_GRAPH_ID: str = create_summarization_workflow(engine)
 
@@ -34,6 +56,17 @@ def root() -> Dict[str, Any]:
     }
 
 
+def _json_response(model: BaseModel) -> Response:
+    """
+    Serialize a response model in a single pydantic-core pass.
+
+    Returning a Response directly skips FastAPI's re-validation of the
+    (potentially large) state and log against response_model; the
+    response_model is still used for the OpenAPI schema.
+    """
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+
 # ---------- GRAPH ENDPOINTS ----------
 
 
@@ -50,17 +83,20 @@ def create_graph(request: GraphCreateRequest) -> GraphCreateResponse:
       "edges": [...]
     }
     """
-    graph_id = engine.create_graph(
-        name=request.name,
-        start_node=request.start_node,
-        nodes_cfg=request.nodes,
-        edges_cfg=request.edges,
-    )
+    try:
+        graph_id = engine.create_graph(
+            name=request.name,
+            start_node=request.start_node,
+            nodes_cfg=request.nodes,
+            edges_cfg=request.edges,
+        )
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return GraphCreateResponse(graph_id=graph_id)
 
 
 @app.post("/graph/run", response_model=GraphRunResponse)
-def run_graph(request: GraphRunRequest) -> GraphRunResponse:
+async def run_graph(request: GraphRunRequest) -> Response:
     """
     Run a graph end-to-end with the given initial state.
 
@@ -74,43 +110,74 @@ def run_graph(request: GraphRunRequest) -> GraphRunResponse:
         "max_summary_words": 80
       }
     }
+
+    With "background": true the run is queued on a worker pool and the
+    response comes back immediately with status "running"; poll
+    GET /graph/state/{run_id} for progress and the final state.
     """
     try:
-        run = engine.run_graph(
-            graph_id=request.graph_id,
-            initial_state=request.initial_state,
-        )
+        if request.background:
+            if run_executor is None:
+                raise HTTPException(status_code=503, detail="Background runs are not available.")
+            run = engine.submit_run(
+                run_executor,
+                graph_id=request.graph_id,
+                initial_state=request.initial_state,
+                snapshot_full=request.snapshot_full,
+            )
+        else:
+            run = await engine.run_graph_async(
+                graph_id=request.graph_id,
+                initial_state=request.initial_state,
+                snapshot_full=request.snapshot_full,
+            )
+    except HTTPException:
+        raise
     except KeyError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    return GraphRunResponse(
+    # Read status before copying state/log: the worker sets it last, so a
+    # "completed" status guarantees the copies below are complete too.
+    status = run.status  # "running" / "completed" / "failed"
+
+    # Built by the engine, so already well-typed: skip validation.
+    # Shallow copies: a background run may still be updating these.
+    return _json_response(GraphRunResponse.model_construct(
         run_id=run.id,
-        final_state=run.state,
-        log=run.log,
-        status=run.status,  # "running" / "completed" / "failed"
-    )
+        final_state=dict(run.state),
+        log=list(run.log),
+        status=status,
+    ))
 
 
 @app.get("/graph/state/{run_id}", response_model=RunStateResponse)
-def get_run_state(run_id: str) -> RunStateResponse:
+def get_run_state(run_id: str, include_log: bool = True) -> Response:
     """
     Fetch the current state and execution log for a given run.
 
-    In this minimal version, runs are executed synchronously,
-    so this will typically return the final state.
+    Pass ?include_log=false to skip the step log (cheap status polling).
+
+    For background runs still in progress, this returns the state and
+    log as of the last completed step.
     """
     try:
-        run = engine.get_run(run_id)
+        run = engine.get_run(run_id, include_log=include_log)
     except KeyError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
-    return RunStateResponse(
+    # As in run_graph: status first, then the state/log copies
+    status = run.status
+    current_node = run.current_node
+    error = run.error
+
+    return _json_response(RunStateResponse.model_construct(
         run_id=run.id,
         graph_id=run.graph_id,
-        status=run.status,
-        current_node=run.current_node,
-        state=run.state,
-        log=run.log,
-    )
+        status=status,
+        current_node=current_node,
+        state=dict(run.state),
+        log=list(run.log) if include_log else None,
+        error=error,
+    ))
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Literal
 from pydantic import BaseModel
 
@@ -43,18 +44,32 @@ class GraphCreateResponse(BaseModel):
 class GraphRunRequest(BaseModel):
     graph_id: str
     initial_state: Dict[str, Any] = {}
+    # Also log the full state after every step (debugging; slower)
+    snapshot_full: bool = False
+    # Return immediately with status "running"; poll /graph/state/{run_id}
+    background: bool = False
 
 
-class StepLog(BaseModel):
+@dataclass(slots=True)
+class StepLog:
+    """
+    One executed step of a run.
+
+    Created by the engine on every step, so it is a plain slotted dataclass
+    rather than a BaseModel: no validation on construction, no per-instance
+    __dict__. Pydantic still serializes it inside the response models.
+    """
     step_index: int
     node_id: str
     tool: str
-    state_snapshot: Dict[str, Any]
+    updates: Dict[str, Any]
+    snapshot_id: int  # run journal length after this step
+    state_snapshot: Optional[Dict[str, Any]] = None
 
 
 class GraphRunResponse(BaseModel):
     run_id: str
-    final_state: Dict[str, Any]
+    final_state: Dict[str, Any]  # state so far while status is "running"
     log: List[StepLog]
     status: Literal["running", "completed", "failed"]
 
@@ -65,4 +80,5 @@ class RunStateResponse(BaseModel):
     status: Literal["running", "completed", "failed"]
     current_node: Optional[str]
     state: Dict[str, Any]
-    log: List[StepLog]
+    log: Optional[List[StepLog]] = None  # None when requested without the log
+    error: Optional[str] = None  # set if a tool raised during the run
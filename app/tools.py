@@ -1,9 +1,42 @@
+import re
+from functools import lru_cache
 from typing import Any, Dict, List, Tuple
 
 from .engine import ToolRegistry
 
 
-def split_text_tool(state: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+# Texts shorter than this are split directly; caching them costs more than it saves.
+_SPLIT_CACHE_MIN_CHARS = 1024
+# Texts longer than this are never cached, so the cache can't pin huge inputs in RAM.
+_SPLIT_CACHE_MAX_CHARS = 1 << 20
+
+
+@lru_cache(maxsize=32)
+def _chunk_pattern(chunk_size: int) -> "re.Pattern[str]":
+    """Regex matching one chunk: up to chunk_size whitespace-separated words."""
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}.")
+    return re.compile(r"\S+(?:\s+\S+){0,%d}" % (chunk_size - 1))
+
+
+def _split_chunks(text: str, chunk_size: int) -> Tuple[str, ...]:
+    # The regex engine finds chunk boundaries in one native pass; each chunk
+    # is a slice of text, so no per-word strings are created.
+    if chunk_size > 0:
+        # text can't hold more than len(text) words; clamping keeps the
+        # regex repeat count in range for huge chunk_size values
+        chunk_size = min(chunk_size, len(text) or 1)
+    return tuple(_chunk_pattern(chunk_size).findall(text))
+
+
+# Each entry pins its text plus a chunk tuple of about the same size: at most
+# ~8 MiB for a 1M-character non-ASCII text, so ~32 MiB for the whole cache.
+@lru_cache(maxsize=4)
+def _split_chunks_cached(text: str, chunk_size: int) -> Tuple[str, ...]:
+    return _split_chunks(text, chunk_size)
+
+
+def split_text_tool(state: Dict[str, Any], config: Any) -> Dict[str, Any]:
     """
     Split raw text into chunks of roughly N words.
 
@@ -12,31 +45,34 @@ def split_text_tool(state: Dict[str, Any], config: Dict[str, Any]) -> Dict[str,
         state["chunk_size"]: int (optional, default 80)
 
     Produces:
-        state["chunks"]: List[str]
+        state["chunks"]: List[str] (slices of the original text)
     """
     text = state.get("text", "")
-    chunk_size = state.get("chunk_size", config.get("chunk_size", 80))
+    chunk_size = state.get("chunk_size", config.chunk_size)
 
-    words = text.split()
-    chunks: List[str] = []
-    for i in range(0, len(words), chunk_size):
-        chunk_words = words[i: i + chunk_size]
-        chunks.append(" ".join(chunk_words))
+    if _SPLIT_CACHE_MIN_CHARS <= len(text) <= _SPLIT_CACHE_MAX_CHARS:
+        chunks = list(_split_chunks_cached(text, chunk_size))
+    else:
+        chunks = list(_split_chunks(text, chunk_size))
 
     return {"chunks": chunks}
 
 
+split_text_tool.CONFIG_SCHEMA = {"chunk_size": (int, 80)}
+
+
 def summarize_chunk(chunk: str, max_words: int) -> str:
     """
     Very naive 'summary':
       - Take the first max_words words.
       - This keeps it strictly rule-based (no ML).
     """
-    words = chunk.split()
-    return " ".join(words[:max_words])
+    # maxsplit stops tokenizing after max_words words; the rest of the
+    # chunk stays one unsplit tail that is sliced away.
+    return " ".join(chunk.split(None, max_words)[:max_words])
 
 
-def summarize_chunks_tool(state: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+def summarize_chunks_tool(state: Dict[str, Any], config: Any) -> Dict[str, Any]:
     """
     Generate a small summary for each chunk.
 
@@ -50,7 +86,7 @@ def summarize_chunks_tool(state: Dict[str, Any], config: Dict[str, Any]) -> Dict
     chunks: List[str] = state.get("chunks", [])
     per_chunk_summary_size = state.get(
         "per_chunk_summary_size",
-        config.get("per_chunk_summary_size", 30),
+        config.per_chunk_summary_size,
     )
 
     summaries = [
@@ -60,6 +96,9 @@ def summarize_chunks_tool(state: Dict[str, Any], config: Dict[str, Any]) -> Dict
     return {"chunk_summaries": summaries}
 
 
+summarize_chunks_tool.CONFIG_SCHEMA = {"per_chunk_summary_size": (int, 30)}
+
+
 def merge_summaries_tool(state: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
     """
     Merge chunk summaries into a single long summary.
@@ -75,7 +114,7 @@ def merge_summaries_tool(state: Dict[str, Any], config: Dict[str, Any]) -> Dict[
     return {"summary": summary}
 
 
-def refine_summary_tool(state: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+def refine_summary_tool(state: Dict[str, Any], config: Any) -> Dict[str, Any]:
     """
     Refine / shorten the summary heuristically.
 
@@ -89,17 +128,23 @@ def refine_summary_tool(state: Dict[str, Any], config: Dict[str, Any]) -> Dict[s
 
     Produces (updated):
         state["summary"]: str
+        state["summary_length"]: int (word count after refining)
     """
     summary: str = state.get("summary", "")
-    max_words = state.get("max_summary_words", config.get("max_summary_words", 80))
+    max_words = state.get("max_summary_words", config.max_summary_words)
 
-    words = summary.split()
-    if len(words) <= max_words:
+    # Bounded split: at most max_words words plus one unsplit tail, so a
+    # long summary is never fully tokenized just to be truncated.
+    parts = summary.split(None, max_words)
+    if len(parts) <= max_words:
         # Nothing to change
-        return {}
+        return {"summary_length": len(parts)}
+
+    shortened = " ".join(parts[:max_words])
+    return {"summary": shortened, "summary_length": max_words}
+
 
-    shortened = " ".join(words[:max_words])
-    return {"summary": shortened}
+refine_summary_tool.CONFIG_SCHEMA = {"max_summary_words": (int, 80)}
 
 
 def evaluate_summary_tool(state: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
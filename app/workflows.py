@@ -18,7 +18,11 @@ def create_summarization_workflow(engine: GraphEngine) -> str:
       evaluate:
          if summary_length > 80 -> refine
          else -> end
-      refine -> evaluate  (loop)
+      refine -> end
+
+    refine truncates to max_summary_words and reports the new
+    summary_length itself, so looping back to evaluate would only
+    re-measure a summary that is already short enough.
     """
 
     nodes = [
@@ -45,8 +49,8 @@ def create_summarization_workflow(engine: GraphEngine) -> str:
             false_target=None,  # None means terminate
         ),
 
-        # Loop edge: refine -> evaluate
-        EdgeConfig(from_node="refine", to_node="evaluate"),
+        # refine is terminal: it already sets the final summary_length
+        EdgeConfig(from_node="refine", to_node=None),
     ]
 
     graph_id = engine.create_graph(